@@ -6,7 +6,7 @@
 # All rights reserved.
 #
 import re
-from amaranth import Elaboratable, Module
+from amaranth import Elaboratable, Module, Cat
 from amaranth import ClockSignal, ResetSignal
 from amaranth import Value
 from amaranth.back import verilog
@@ -21,6 +21,7 @@ from input_interface import input_interface
 from output_interface import output_interface
 from memory_controller import memory_controller
 from replacer import replacer
+from logic_base import logic_base
 from globals import OPTS
 
 
@@ -67,8 +68,9 @@ class design(Elaboratable):
             # Delete auto-generated flops
             if "$next" in lines[i]:
                 lines[i] = ""
-            # Delete attributes from lines
-            lines[i] = re.sub(r"\(\*.*\*\)", "", lines[i])
+            # Delete attributes from lines except the FSM encoding hint
+            if "fsm_encoding" not in lines[i]:
+                lines[i] = re.sub(r"\(\*.*\*\)", "", lines[i])
             # Delete comments from lines
             lines[i] = re.sub(r"\/\*.*\*\/", "", lines[i])
             # Check if line is whitespace only
@@ -89,6 +91,9 @@ class design(Elaboratable):
         self.add_srams(self.m)
         self.add_flop_block(self.m)
         self.add_default_statements(self.m)
+        self.add_parse_block(self.m)
+        self.add_dram_address_block(self.m)
+        self.add_condition_block(self.m)
         self.add_logic_blocks(self.m)
 
         return self.m
@@ -142,7 +147,28 @@ class design(Elaboratable):
         if not OPTS.read_only:
             self.din_reg = cache_signal(self.word_size if self.offset_size else self.line_size, is_flop=True)
         # State flop
-        self.state = cache_signal(state, is_flop=True)
+        # One-hot encoding is requested so that each state is decoded with a
+        # single bit instead of comparing all state bits.
+        self.state = cache_signal(state, is_flop=True, attrs={"fsm_encoding": "one-hot"})
+
+        # Parsed fields of the address input
+        self.addr_tag = cache_signal(self.tag_size)
+        self.addr_set = cache_signal(self.set_size)
+        if self.offset_size:
+            self.addr_offset = cache_signal(self.offset_size)
+
+        # DRAM addresses of the current request and the line in the current way
+        self.fill_addr = cache_signal(self.dram_address_size)
+        self.writeback_addr = cache_signal(self.dram_address_size)
+
+        # Conditions shared by logic blocks
+        self.mem_ready = cache_signal()
+        self.last_set = cache_signal()
+        if OPTS.has_flush:
+            self.flush_ready = cache_signal()
+            self.last_way = cache_signal()
+        if OPTS.data_hazard:
+            self.same_set = cache_signal()
 
 
     def add_srams(self, m):
@@ -178,6 +204,45 @@ class design(Elaboratable):
                 m.d.comb += v.eq(v)
 
 
+    def add_parse_block(self, m):
+        """ Add parsed address fields of the CPU request. """
+
+        # Address is parsed only once here so that logic blocks share the same
+        # tag, set, and offset wires instead of slicing the address every time.
+        m.d.comb += self.addr_tag.eq(self.addr.parse_tag())
+        m.d.comb += self.addr_set.eq(self.addr.parse_set())
+        if self.offset_size:
+            m.d.comb += self.addr_offset.eq(self.addr.parse_offset())
+
+
+    def add_dram_address_block(self, m):
+        """ Add DRAM addresses used by the memory controller. """
+
+        # DRAM addresses are built only once here so that DRAM address input
+        # is driven by the same wires in all states.
+        m.d.comb += self.fill_addr.eq(Cat(self.set, self.tag))
+        m.d.comb += self.writeback_addr.eq(Cat(self.set, self.tag_array.output().tag(self.way)))
+
+
+    def add_condition_block(self, m):
+        """ Add conditions shared by logic blocks. """
+
+        # DRAM is ready to accept a new request
+        m.d.comb += self.mem_ready.eq(~self.dram.stall())
+        # Current way can be skipped while flushing since either it is clean or
+        # its write request is sent to DRAM
+        if OPTS.has_flush:
+            m.d.comb += self.flush_ready.eq(~self.tag_array.output().dirty(self.way) | self.mem_ready)
+        # Set and way registers reached the end while resetting or flushing
+        m.d.comb += self.last_set.eq(self.set == self.num_rows - 1)
+        if OPTS.has_flush:
+            m.d.comb += self.last_way.eq(self.way == self.num_ways - 1)
+        # CPU's new request is in the same set as the current request, so the
+        # data hazard might occur
+        if OPTS.data_hazard:
+            m.d.comb += self.same_set.eq(self.set == self.addr_set)
+
+
     def add_logic_blocks(self, m):
         """ Instantiate and add logic blocks. """
         debug.info(1, "Adding logic blocks...")
@@ -191,7 +256,25 @@ class design(Elaboratable):
         logics.append(input_interface())
         logics.append(output_interface())
         logics.append(memory_controller())
-        logics.append(replacer())
+        # Replacement policy logic is added only if the cache has one
+        replacer_logic = replacer().get_replacer()
+        if replacer_logic:
+            logics.append(replacer_logic)
+
+        for logic in logics:
+            logic.add_always(self, m)
 
+        # All logic modules share a single switch on the state. Statements of
+        # every logic module are added together under each state's case.
+        with m.Switch(self.state):
+            for s in logic_base.get_states():
+                with m.Case(s):
+                    for logic in logics:
+                        logic.add_state(self, m, s)
+
+        # Flush and reset signals override the statements above
+        if OPTS.has_flush:
+            for logic in logics:
+                logic.add_flush_sig(self, m)
         for logic in logics:
-            logic.add(self, m)
\ No newline at end of file
+            logic.add_reset_sig(self, m)
\ No newline at end of file
@@ -35,6 +35,8 @@ class replacement_policy(IntEnum):
     FIFO = 1
     LRU = 2
     RANDOM = 3
+    PLRU = 4
+    TREE_PLRU = 5
 
 
     def __str__(self):
@@ -56,10 +58,14 @@ class replacement_policy(IntEnum):
             return "Least Recently Used"
         if self == replacement_policy.RANDOM:
             return "Random"
+        if self == replacement_policy.PLRU:
+            return "Pseudo Least Recently Used"
+        if self == replacement_policy.TREE_PLRU:
+            return "Tree Pseudo Least Recently Used"
 
 
-    def has_sram_array(self):
-        """ Return True if the replacement policy needs a separate SRAM array. """
+    def has_use_array(self):
+        """ Return True if the replacement policy needs a use array. """
 
         return self not in [
             replacement_policy.NONE,
@@ -67,10 +73,22 @@ class replacement_policy(IntEnum):
         ]
 
 
+    def has_sram_array(self):
+        """ Return True if the replacement policy needs a separate SRAM array. """
+
+        from globals import OPTS
+        # Use array isn't an SRAM array if it is implemented with flip-flops
+        return self.has_use_array() and not OPTS.use_array_flops
+
+
     def updated_after_read(self):
         """ Return True if the replacement policy updated its SRAM array after a read. """
 
-        return self == replacement_policy.LRU
+        return self in [
+            replacement_policy.LRU,
+            replacement_policy.PLRU,
+            replacement_policy.TREE_PLRU
+        ]
 
 
     @staticmethod
@@ -16,8 +16,7 @@ class state(IntEnum):
     IDLE = 2
     COMPARE = 3
     WRITE = 4
-    WAIT_WRITE = 5
-    READ = 6
-    WAIT_READ = 7
-    FLUSH_HAZARD = 8
-    WAIT_HAZARD = 9
\ No newline at end of file
+    READ = 5
+    WAIT_READ = 6
+    FLUSH_HAZARD = 7
+    WAIT_HAZARD = 8
\ No newline at end of file
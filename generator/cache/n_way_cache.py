@@ -8,6 +8,7 @@
 from cache_base import cache_base
 from cache_signal import cache_signal
 from sram_instance import sram_instance
+from flop_instance import flop_instance
 from policy import replacement_policy as rp
 from globals import OPTS
 
@@ -28,6 +29,10 @@ class n_way_cache(cache_base):
                 use_size = self.way_size
             elif OPTS.replacement_policy == rp.LRU:
                 use_size = self.way_size * self.num_ways
+            elif OPTS.replacement_policy == rp.PLRU:
+                use_size = self.num_ways
+            elif OPTS.replacement_policy == rp.TREE_PLRU:
+                use_size = self.num_ways - 1
 
             # Use array of the cache
             use_opts = {}
@@ -63,11 +68,18 @@ class n_way_cache(cache_base):
 
         super().add_srams(m)
 
-        if OPTS.replacement_policy.has_sram_array():
+        if OPTS.replacement_policy.has_use_array():
             if OPTS.replacement_policy == rp.FIFO:
                 use_size = self.way_size
             elif OPTS.replacement_policy == rp.LRU:
                 use_size = self.way_size * self.num_ways
+            elif OPTS.replacement_policy == rp.PLRU:
+                use_size = self.num_ways
+            elif OPTS.replacement_policy == rp.TREE_PLRU:
+                use_size = self.num_ways - 1
 
             # Use array
-            self.use_array = sram_instance(OPTS.use_array_name, use_size, 1, self, m)
\ No newline at end of file
+            if OPTS.replacement_policy.has_sram_array():
+                self.use_array = sram_instance(OPTS.use_array_name, use_size, 1, self, m)
+            else:
+                self.use_array = flop_instance(OPTS.use_array_name, use_size, 1, self, m)
\ No newline at end of file
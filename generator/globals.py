@@ -11,14 +11,11 @@ and performs the global OpenCache setup as well.
 """
 import os
 import debug
-import shutil
-import optparse
+import argparse
 import options
 import sys
-import re
-import copy
 import importlib
-import getpass
+import inspect
 
 VERSION = "0.0.1"
 NAME = "OpenCache v{}".format(VERSION)
@@ -33,44 +30,50 @@ def parse_args():
 
     global OPTS
 
-    option_list = {
-        optparse.make_option("-o", "--output",
-                             dest="output_name",
-                             help="Base output file name(s) prefix",
-                             metavar="FILE"),
-        optparse.make_option("-p", "--outpath",
-                             dest="output_path",
-                             help="Output file(s) location"),
-        optparse.make_option("-v", "--verbose",
-                             action="count",
-                             dest="verbose_level",
-                             help="Increase the verbosity level"),
-        optparse.make_option("-j", "--threads",
-                             action="store",
-                             type="int",
-                             help="Specify the number of threads (default: 1)",
-                             dest="num_threads"),
-        optparse.make_option("-k", "--keeptemp",
-                             action="store_true",
-                             dest="keep_temp",
-                             help="Keep the contents of the temp directory after a successful run"),
-        optparse.make_option("--sim",
-                             action="store_true",
-                             dest="simulate",
-                             help="Enable verification via simulation"),
-        optparse.make_option("--syn",
-                             action="store_true",
-                             dest="synthesize",
-                             help="Enable verification via synthesis")
-        # -h --help is implicit.
-    }
-
-    parser = optparse.OptionParser(option_list=option_list,
-                                   description=NAME,
-                                   usage=USAGE,
-                                   version=VERSION)
-
-    (options, args) = parser.parse_args(values=OPTS)
+    # Options are only set if they are given so that the config file can set
+    # the rest
+    parser = argparse.ArgumentParser(description=NAME,
+                                     usage=USAGE,
+                                     argument_default=argparse.SUPPRESS)
+    parser.add_argument("-o", "--output",
+                        dest="output_name",
+                        help="Base output file name(s) prefix",
+                        metavar="FILE")
+    parser.add_argument("-p", "--outpath",
+                        dest="output_path",
+                        help="Output file(s) location")
+    parser.add_argument("-v", "--verbose",
+                        action="count",
+                        dest="verbose_level",
+                        help="Increase the verbosity level")
+    parser.add_argument("-j", "--threads",
+                        action="store",
+                        type=int,
+                        help="Specify the number of threads (default: 1)",
+                        dest="num_threads")
+    parser.add_argument("-k", "--keeptemp",
+                        action="store_true",
+                        dest="keep_temp",
+                        help="Keep the contents of the temp directory after a successful run")
+    parser.add_argument("--sim",
+                        action="store_true",
+                        dest="simulate",
+                        help="Enable verification via simulation")
+    parser.add_argument("--syn",
+                        action="store_true",
+                        dest="synthesize",
+                        help="Enable verification via synthesis")
+    parser.add_argument("--version",
+                        action="version",
+                        version=VERSION)
+    # -h --help is implicit.
+
+    (options, args) = parser.parse_known_args(namespace=OPTS)
+
+    # Remaining arguments are positional, so they can't be options
+    for arg in args:
+        if arg.startswith("-"):
+            parser.error("no such option: {}".format(arg))
 
     return (options, args)
 
@@ -82,19 +85,23 @@ def print_banner():
     if OPTS.is_unit_test or not OPTS.print_banner:
         return
 
-    debug.print_raw("|==============================================================================|")
-    debug.print_raw("|=========" + NAME.center(60) + "=========|")
-    debug.print_raw("|=========" + " ".center(60) + "=========|")
-    debug.print_raw("|=========" + "VLSI Design and Automation Lab".center(60) + "=========|")
-    debug.print_raw("|=========" + "Computer Science and Engineering Department".center(60) + "=========|")
-    debug.print_raw("|=========" + "University of California Santa Cruz".center(60) + "=========|")
-    debug.print_raw("|=========" + " ".center(60) + "=========|")
+    # Print all lines at once so that the log file is opened only once
     user_info = "Usage help: openram-user-group@ucsc.edu"
-    debug.print_raw("|=========" + user_info.center(60) + "=========|")
     dev_info = "Development help: openram-dev-group@ucsc.edu"
-    debug.print_raw("|=========" + dev_info.center(60) + "=========|")
-    debug.print_raw("|=========" + "See LICENSE for license info".center(60) + "=========|")
-    debug.print_raw("|==============================================================================|")
+    banner = [
+        "|==============================================================================|",
+        "|=========" + NAME.center(60) + "=========|",
+        "|=========" + " ".center(60) + "=========|",
+        "|=========" + "VLSI Design and Automation Lab".center(60) + "=========|",
+        "|=========" + "Computer Science and Engineering Department".center(60) + "=========|",
+        "|=========" + "University of California Santa Cruz".center(60) + "=========|",
+        "|=========" + " ".center(60) + "=========|",
+        "|=========" + user_info.center(60) + "=========|",
+        "|=========" + dev_info.center(60) + "=========|",
+        "|=========" + "See LICENSE for license info".center(60) + "=========|",
+        "|==============================================================================|",
+    ]
+    debug.print_raw("\n".join(banner))
 
 
 def check_versions():
@@ -119,12 +126,6 @@ def init_opencache(config_file, is_unit_test=True):
 
     setup_paths()
 
-    read_config(config_file, is_unit_test)
-
-    fix_config()
-
-    init_paths()
-
     global OPTS
     global CHECKPOINT_OPTS
 
@@ -134,14 +135,23 @@ def init_opencache(config_file, is_unit_test=True):
     # If a unit test fails,
     # we don't have to worry about restoring the old config values
     # that may have been tested.
+    # Options in the checkpoint are already fixed, so the config file isn't
+    # read and fixed again.
     if is_unit_test and CHECKPOINT_OPTS:
-        OPTS.__dict__ = CHECKPOINT_OPTS.__dict__.copy()
+        OPTS.__dict__ = CHECKPOINT_OPTS.copy()
+        init_paths()
         return
 
+    read_config(config_file, is_unit_test)
+
+    fix_config()
+
+    init_paths()
+
     # Make a checkpoint of the options so we can restore
     # after each unit test
     if not CHECKPOINT_OPTS:
-        CHECKPOINT_OPTS = copy.copy(OPTS)
+        CHECKPOINT_OPTS = OPTS.__dict__.copy()
 
 
 def read_config(config_file, is_unit_test=True):
@@ -153,15 +163,17 @@ def read_config(config_file, is_unit_test=True):
     """
     global OPTS
 
+    # Expand the user if it is used
+    # This is done first since a path starting with the user isn't absolute
+    config_file = os.path.expanduser(config_file)
+
     # it is already not an abs path, make it one
     if not os.path.isabs(config_file):
         config_file = os.getcwd() + "/" + config_file
 
     # Make it a python file if the base name was only given
-    config_file = re.sub(r"\.py$", "", config_file)
-
-    # Expand the user if it is used
-    config_file = os.path.expanduser(config_file)
+    if config_file.endswith(".py"):
+        config_file = config_file[:-3]
 
     OPTS.config_file = config_file + ".py"
     # Add the path to the system path
@@ -188,6 +200,10 @@ def read_config(config_file, is_unit_test=True):
 
     OPTS.overridden = {}
     for k, v in config.__dict__.items():
+        # Skip the module attributes (such as __builtins__) and the modules
+        # imported by the config file since they aren't options
+        if k.startswith("_") or inspect.ismodule(v):
+            continue
         # The command line will over-ride the config file
         # Note that if we re-read a config file, nothing will get read again!
         if k not in OPTS.__dict__:
@@ -239,6 +255,7 @@ def fix_config():
 
     # Create a new folder for each process of unit tests
     if OPTS.is_unit_test:
+        import getpass
         OPTS.output_path += "opencache_{0}_{1}/".format(getpass.getuser(),
                                                         os.getpid())
     # Create a new folder for this run if not unit test
@@ -276,6 +293,7 @@ def purge_temp():
     debug.info(1, "Purging temp directory: {}".format(OPTS.temp_path))
 
     # Remove all files and subdirectories under the temp directory
+    import shutil
     shutil.rmtree(OPTS.temp_path, ignore_errors=True)
 
 
@@ -300,11 +318,13 @@ def setup_paths():
         debug.warning("$OPENRAM_HOME is not properly defined.")
 
     # Add all of the subdirs to the Python path
-    subdir_list = [item for item in os.listdir(OPENCACHE_HOME) if os.path.isdir(os.path.join(OPENCACHE_HOME, item))]
-    for subdir in subdir_list:
-        full_path = "{0}/{1}".format(OPENCACHE_HOME, subdir)
-        if "__pycache__" not in full_path:
-            sys.path.append(full_path)
+    # Directory entries already know if they are directories, so they don't
+    # need to be checked again. Subdirs added by a previous call (such as
+    # previous unit tests) are skipped.
+    with os.scandir(OPENCACHE_HOME) as entries:
+        for entry in entries:
+            if entry.is_dir() and entry.name != "__pycache__" and entry.path not in sys.path:
+                sys.path.append(entry.path)
 
 
 def init_paths():
@@ -399,13 +419,20 @@ def report_status():
     # N-way or Fully Associative caches should have a replacement policy
     if OPTS.num_ways > 1 and OPTS.replacement_policy == rp.NONE:
         debug.error("N-way Set Associative and Fully Associative caches need replacement policy.", -1)
+    # Tree PLRU needs a complete binary tree of ways
+    if OPTS.replacement_policy == rp.TREE_PLRU and OPTS.num_ways & (OPTS.num_ways - 1):
+        debug.error("Tree PLRU caches need a power of two number of ways.", -1)
 
     # Print cache info
-    debug.print_raw("\nCache type: {}".format("Instruction" if OPTS.read_only else "Data"))
-    debug.print_raw("Word size: {}".format(OPTS.word_size))
-    debug.print_raw("Words per line: {}".format(OPTS.words_per_line))
-    debug.print_raw("Number of ways: {}".format(OPTS.num_ways))
-    debug.print_raw("Replacement policy: {}".format(OPTS.replacement_policy.long_name()))
-    debug.print_raw("Write policy: {}".format(OPTS.write_policy.long_name() if OPTS.write_policy else "None"))
-    debug.print_raw("Return type: {}".format(OPTS.return_type.capitalize()))
-    debug.print_raw("Data hazard: {}\n".format(OPTS.data_hazard))
\ No newline at end of file
+    # Print all lines at once so that the log file is opened only once
+    info = [
+        "\nCache type: {}".format("Instruction" if OPTS.read_only else "Data"),
+        "Word size: {}".format(OPTS.word_size),
+        "Words per line: {}".format(OPTS.words_per_line),
+        "Number of ways: {}".format(OPTS.num_ways),
+        "Replacement policy: {}".format(OPTS.replacement_policy.long_name()),
+        "Write policy: {}".format(OPTS.write_policy.long_name() if OPTS.write_policy else "None"),
+        "Return type: {}".format(OPTS.return_type.capitalize()),
+        "Data hazard: {}\n".format(OPTS.data_hazard),
+    ]
+    debug.print_raw("\n".join(info))
\ No newline at end of file
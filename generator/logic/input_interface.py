@@ -6,7 +6,6 @@
 # All rights reserved.
 #
 from logic_base import logic_base
-from state import state
 from policy import write_policy as wp
 from globals import OPTS
 
@@ -30,8 +29,7 @@ class input_interface(logic_base):
 
         # In the RESET state, set register is used to reset all lines in
         # the tag array.
-        with m.Case(state.RESET):
-            m.d.comb += c.set.eq(c.set + 1)
+        m.d.comb += c.set.eq(c.set + 1)
 
 
     def add_flush(self, c, m):
@@ -39,34 +37,31 @@ class input_interface(logic_base):
 
         # In the FLUSH state, set register is used to write all dirty lines
         # back to DRAM.
-        with m.Case(state.FLUSH):
-            # If current set is clean or DRAM is available, increment the set
-            # register when all ways in the set are checked
-            with m.If((~c.tag_array.output().dirty(c.way) | ~c.dram.stall()) & (c.way == c.num_ways - 1)):
-                m.d.comb += c.set.eq(c.set + 1)
+        # If current set is clean or DRAM is available, increment the set
+        # register when all ways in the set are checked
+        with m.If(c.flush_ready & c.last_way):
+            m.d.comb += c.set.eq(c.set + 1)
 
 
     def add_idle(self, c, m):
         """ Add statements for the IDLE state. """
 
         # In the IDLE state, the request is decoded.
-        with m.Case(state.IDLE):
-            self.store_request(c, m)
+        self.store_request(c, m)
 
 
     def add_compare(self, c, m):
         """ Add statements for the COMPARE state. """
 
         # In the COMPARE state, the request is decoded if current request is hit.
-        with m.Case(state.COMPARE):
-            for _ in c.hit_detector.find_hit():
-                # If write policy is write-through, take the next request if
-                # current request is read or DRAM is available.
-                if OPTS.write_policy == wp.WRITE_THROUGH:
-                    with m.If(c.web_reg | ~c.dram.stall()):
-                        self.store_request(c, m)
-                else:
+        with c.hit_detector.check_any_hit():
+            # If write policy is write-through, take the next request if
+            # current request is read or DRAM is available.
+            if OPTS.write_policy == wp.WRITE_THROUGH:
+                with m.If(c.web_reg | c.mem_ready):
                     self.store_request(c, m)
+            else:
+                self.store_request(c, m)
 
 
     def add_write(self, c, m):
@@ -77,9 +72,8 @@ class input_interface(logic_base):
             return
 
         # In the WRITE state, the next request is stored.
-        with m.Case(state.WRITE):
-            with m.If(~c.dram.stall()):
-                self.store_request(c, m)
+        with m.If(c.mem_ready):
+            self.store_request(c, m)
 
 
     def add_wait_read(self, c, m):
@@ -87,9 +81,8 @@ class input_interface(logic_base):
 
         # In the WAIT_READ state, the request is decoded if DRAM completed the
         # previous read request.
-        with m.Case(state.WAIT_READ):
-            with m.If(~c.dram.stall()):
-                self.store_request(c, m)
+        with m.If(c.mem_ready):
+            self.store_request(c, m)
 
 
     def add_flush_sig(self, c, m):
@@ -126,10 +119,10 @@ class input_interface(logic_base):
     def store_request(self, c, m):
         """ Decode and store the request signals in flip-flops. """
 
-        m.d.comb += c.tag.eq(c.addr.parse_tag())
-        m.d.comb += c.set.eq(c.addr.parse_set())
+        m.d.comb += c.tag.eq(c.addr_tag)
+        m.d.comb += c.set.eq(c.addr_set)
         if c.offset_size:
-            m.d.comb += c.offset.eq(c.addr.parse_offset())
+            m.d.comb += c.offset.eq(c.addr_offset)
         if not OPTS.read_only:
             m.d.comb += c.web_reg.eq(c.web)
         if c.num_masks:
@@ -5,7 +5,7 @@
 # (acting for and on behalf of Oklahoma State University)
 # All rights reserved.
 #
-from policy import write_policy as wp
+from state import state
 from globals import OPTS
 
 
@@ -19,34 +19,45 @@ class logic_base:
         pass
 
 
-    def add(self, c, m):
-        """ Add all sections of the always block code. """
+    @staticmethod
+    def get_states():
+        """ Return the list of states that the cache design has. """
 
-        self.add_states(c, m)
+        states = [state.RESET]
         if OPTS.has_flush:
-            self.add_flush_sig(c, m)
-        self.add_reset_sig(c, m)
+            states.append(state.FLUSH)
+        states.extend([state.IDLE, state.COMPARE, state.READ, state.WAIT_READ])
+        if not OPTS.read_only:
+            states.append(state.WRITE)
+        if OPTS.data_hazard:
+            if OPTS.has_flush:
+                states.append(state.FLUSH_HAZARD)
+            states.append(state.WAIT_HAZARD)
+        return states
+
 
+    def add_always(self, c, m):
+        """ Add statements which don't depend on the state. """
+        pass
 
-    def add_states(self, c, m):
-        """ Add statements for each cache state. """
 
-        with m.Switch(c.state):
-            self.add_reset(c, m)
-            if OPTS.has_flush:
-                self.add_flush(c, m)
-            self.add_idle(c, m)
-            self.add_compare(c, m)
-            self.add_read(c, m)
-            self.add_wait_read(c, m)
-            if not OPTS.read_only:
-                self.add_write(c, m)
-                if OPTS.write_policy == wp.WRITE_BACK:
-                    self.add_wait_write(c, m)
-            if OPTS.data_hazard:
-                if OPTS.has_flush:
-                    self.add_flush_hazard(c, m)
-                self.add_wait_hazard(c, m)
+    def add_state(self, c, m, s):
+        """ Add statements for the given cache state. """
+
+        # NOTE: This is called inside the case of the state. Therefore, the
+        # methods below shouldn't open a case of their own.
+        state_methods = {
+            state.RESET: self.add_reset,
+            state.FLUSH: self.add_flush,
+            state.IDLE: self.add_idle,
+            state.COMPARE: self.add_compare,
+            state.WRITE: self.add_write,
+            state.READ: self.add_read,
+            state.WAIT_READ: self.add_wait_read,
+            state.FLUSH_HAZARD: self.add_flush_hazard,
+            state.WAIT_HAZARD: self.add_wait_hazard,
+        }
+        state_methods[s](c, m)
 
 
     def add_reset(self, c, m):
@@ -74,11 +85,6 @@ class logic_base:
         pass
 
 
-    def add_wait_write(self, c, m):
-        """ Add statements for the WAIT_WRITE state. """
-        pass
-
-
     def add_read(self, c, m):
         """ Add statements for the READ state. """
         pass
@@ -5,9 +5,9 @@
 # (acting for and on behalf of Oklahoma State University)
 # All rights reserved.
 #
-from amaranth import Cat, C
+from amaranth import Cat, C, Mux
 from logic_base import logic_base
-from state import state
+from cache_signal import cache_signal
 from policy import write_policy as wp
 from globals import OPTS
 
@@ -25,6 +25,26 @@ class memory_controller(logic_base):
         super().__init__()
 
 
+    def add_always(self, c, m):
+        """ Add statements which don't depend on the state. """
+
+        # Tag word written to the tag array is built only once here. States
+        # only change its tag and dirty bit when they write a new tag word.
+        self.new_tag = cache_signal(c.tag_size)
+        self.new_tag_word = cache_signal(c.tag_word_size)
+        m.d.comb += self.new_tag.eq(c.tag)
+        # Instruction caches don't have dirty bit
+        if c.has_dirty:
+            self.new_dirty = cache_signal()
+            m.d.comb += self.new_tag_word.eq(Cat(self.new_tag, self.new_dirty, C(1, 1)))
+        else:
+            m.d.comb += self.new_tag_word.eq(Cat(self.new_tag, C(1, 1)))
+        # Data line of the way register is selected with the way signal instead
+        # of a case for each way.
+        self.way_line = cache_signal(c.line_size)
+        m.d.comb += self.way_line.eq(Cat(*[c.data_array.output(i) for i in range(c.num_ways)]).word_select(c.way, c.line_size))
+
+
     def add_reset(self, c, m):
         """ Add statements for the RESET state. """
 
@@ -32,9 +52,8 @@ class memory_controller(logic_base):
         # the current set.
         # set register is incremented by the Request Block.
         # When set register reaches the end, state switches to IDLE.
-        with m.Case(state.RESET):
-            c.tag_array.write(c.set, 0)
-            c.data_array.write(c.set, 0)
+        c.tag_array.write(c.set, 0)
+        c.data_array.write(c.set, 0)
 
 
     def add_flush(self, c, m):
@@ -44,25 +63,19 @@ class memory_controller(logic_base):
         # set register is incremented by the Request Block.
         # way register is incremented by the Replacement Block.
         # When set and way registers reach the end, state switches to IDLE.
-        with m.Case(state.FLUSH):
-            c.tag_array.read(c.set)
-            c.data_array.read(c.set)
-            with m.Switch(c.way):
-                for i in range(c.num_ways):
-                    with m.Case(i):
-                        # Check if current set is clean or DRAM is available,
-                        # and all ways of the set are checked
-                        if i == c.num_ways - 1:
-                            with m.If(~c.tag_array.output().dirty(i) | ~c.dram.stall()):
-                                # Request the next tag and data lines from SRAMs
-                                c.tag_array.read(c.set + 1)
-                                c.data_array.read(c.set + 1)
-                        # Check if current set is dirty and DRAM is available
-                        with m.If(c.tag_array.output().dirty(i) & ~c.dram.stall()):
-                            # Update dirty bits in the tag line
-                            c.tag_array.write(c.set, Cat(c.tag_array.output().tag(i), C(2, 2)), i)
-                            # Send the write request to DRAM
-                            c.dram.write(Cat(c.set, c.tag_array.output().tag(i)), c.data_array.output(i))
+        self.read_lines(c, c.set)
+        # Check if current set is clean or DRAM is available, and all ways of
+        # the set are checked
+        with m.If(c.flush_ready & c.last_way):
+            # Request the next tag and data lines from SRAMs
+            self.read_lines(c, c.set + 1)
+        # Check if current set is dirty and DRAM is available
+        with m.If(c.tag_array.output().dirty(c.way) & c.mem_ready):
+            # Update dirty bits in the tag line
+            m.d.comb += self.new_tag.eq(c.tag_array.output().tag(c.way))
+            c.tag_array.write(c.set, self.new_tag_word, c.way)
+            # Send the write request to DRAM
+            c.dram.write(c.writeback_addr, self.way_line)
 
 
     def add_idle(self, c, m):
@@ -73,77 +86,77 @@ class memory_controller(logic_base):
         # When there is a new request from the cache stall is asserted, request
         # is decoded and corresponding tag, data, and use array lines are read
         # from internal SRAMs.
-        with m.Case(state.IDLE):
-            # Read next lines from SRAMs even though CPU is not sending a new
-            # request since read is non-destructive.
-            c.tag_array.read(c.addr.parse_set())
-            c.data_array.read(c.addr.parse_set())
+        # Read next lines from SRAMs even though CPU is not sending a new
+        # request since read is non-destructive.
+        self.read_lines(c, c.addr_set)
 
 
     def add_compare(self, c, m):
         """ Add statements for the COMPARE state. """
 
         # In the COMPARE state, cache compares tags.
-        with m.Case(state.COMPARE):
-            c.tag_array.read(c.set)
-            c.data_array.read(c.set)
-            # Execute the lines below only if DRAM is available
-            with m.If(~c.dram.stall()):
-                for is_dirty, i in c.hit_detector.find_miss():
-                    # Assuming that current request is miss, check if it is dirty miss
-                    if is_dirty:
-                        # If DRAM is available, switch to WAIT_WRITE and wait for DRAM to
-                        # complete writing.
-                        c.dram.write(Cat(c.set, c.tag_array.output().tag(i)), c.data_array.output(i))
-                    # Else, assume that current request is clean miss
-                    else:
-                        # If DRAM is busy, switch to READ and wait for DRAM to be available
-                        # If DRAM is available, switch to WAIT_READ and wait for DRAM to
-                        # complete reading
-                        c.dram.read(Cat(c.set, c.tag))
-                # Check if there is an empty way. All empty ways need to be filled
-                # before evicting a random way.
-                # NOTE: The line below should only work for some replacement policies where
-                # the lines above may miss an empty way (such as random replacement).
-                for i in c.hit_detector.find_empty():
+        self.read_lines(c, c.set)
+        # Execute the lines below only if DRAM is available
+        with m.If(c.mem_ready):
+            for is_dirty, i in c.hit_detector.find_miss():
+                # Assuming that current request is miss, check if it is dirty miss
+                if is_dirty:
+                    # If DRAM is available, switch to READ and wait for DRAM to
+                    # complete writing.
+                    c.dram.write(Cat(c.set, c.tag_array.output().tag(i)), c.data_array.output(i))
+                # Else, assume that current request is clean miss
+                else:
                     # If DRAM is busy, switch to READ and wait for DRAM to be available
                     # If DRAM is available, switch to WAIT_READ and wait for DRAM to
                     # complete reading
-                    c.dram.read(Cat(c.set, c.tag))
-            # Check if current request is hit
-            # Compare all ways' tags to find a hit. Since each way has a different
-            # tag, only one of them can match at most.
-            # NOTE: This for loop should not be merged with the one above since hit
-            # should be checked after all miss assumptions are done.
-            for i in c.hit_detector.find_hit():
-                # Disable DRAM since a request could have been sent above
-                c.dram.disable()
-                # Perform the write request if data cache
-                if not OPTS.read_only:
-                    with m.If(~c.web_reg):
-                        # Update dirty bit
-                        if c.has_dirty:
-                            c.tag_array.write(c.set, Cat(c.tag, C(3, 2)), i)
-                        # Perform write request
-                        c.data_array.write(c.set, c.data_array.output(i), i)
-                        c.data_array.write_input(i, c.offset if c.offset_size else None, c.din_reg, c.wmask_reg if c.num_masks else None)
-                        # If write policy is write-through, write to the DRAM
-                        if OPTS.write_policy == wp.WRITE_THROUGH:
-                            c.dram.write(Cat(c.set, c.tag), c.data_array.output(i))
-                            c.dram.write_input(c.offset if c.offset_size else None, c.din_reg, c.wmask_reg if c.num_masks else None)
-                # If write policy is write-through, read next lines if current request
-                # is read or DRAM is available.
-                if OPTS.write_policy == wp.WRITE_THROUGH:
-                    with m.If(c.web_reg | ~c.dram.stall()):
-                        # Read next lines from SRAMs even though the CPU is not sending
-                        # a new request since read is non-destructive.
-                        c.tag_array.read(c.addr.parse_set())
-                        c.data_array.read(c.addr.parse_set())
-                else:
+                    c.dram.read(c.fill_addr)
+            # Check if there is an empty way. All empty ways need to be filled
+            # before evicting a random way.
+            # NOTE: The line below should only work for some replacement policies where
+            # the lines above may miss an empty way (such as random replacement).
+            for i in c.hit_detector.find_empty():
+                # If DRAM is busy, switch to READ and wait for DRAM to be available
+                # If DRAM is available, switch to WAIT_READ and wait for DRAM to
+                # complete reading
+                c.dram.read(c.fill_addr)
+        # Check if current request is hit
+        # Hit of all ways is found only once in the hit detector. Since each
+        # way has a different tag, only one of them can match at most.
+        # NOTE: This should stay after the miss assumptions above so that hit
+        # statements override them.
+        with c.hit_detector.check_any_hit():
+            # Disable DRAM since a request could have been sent above
+            c.dram.disable()
+            # Perform the write request on the hit way if data cache.
+            # The request is merged only once over the hit line, which is
+            # selected with the encoded hit way.
+            if not OPTS.read_only:
+                hit_way = c.hit_detector.hit_way
+                with m.If(~c.web_reg):
+                    # Update dirty bit if the way isn't dirty already. Tag
+                    # doesn't change on hit, so the tag line is written only
+                    # to set the dirty bit.
+                    if c.has_dirty:
+                        with m.If(~c.hit_detector.way_dirty.bit_select(hit_way, 1)):
+                            m.d.comb += self.new_dirty.eq(1)
+                            c.tag_array.write(c.set, self.new_tag_word, hit_way)
+                    # Perform write request
+                    line = self.merge_request(c, c.hit_detector.hit_line)
+                    c.data_array.write(c.set, line, hit_way)
+                    # If write policy is write-through, write to the DRAM
+                    if OPTS.write_policy == wp.WRITE_THROUGH:
+                        c.dram.write(c.fill_addr, line)
+            # If write policy is write-through, read next lines if current request
+            # is read or DRAM is available.
+            if OPTS.write_policy == wp.WRITE_THROUGH:
+                with m.If(c.web_reg | c.mem_ready):
                     # Read next lines from SRAMs even though the CPU is not sending
                     # a new request since read is non-destructive.
-                    c.tag_array.read(c.addr.parse_set())
-                    c.data_array.read(c.addr.parse_set())
+                    self.read_lines(c, c.addr_set)
+            else:
+                # Read next lines from SRAMs even though the CPU is not sending
+                # a new request since read is non-destructive.
+                self.read_lines(c, c.addr_set)
 
 
     def add_write(self, c, m):
@@ -151,55 +164,36 @@ class memory_controller(logic_base):
 
         # In the WRITE state, cache waits for DRAM to be available.
         # When DRAM is available, write request is sent.
-        with m.Case(state.WRITE):
-            c.tag_array.read(c.set)
-            c.data_array.read(c.set)
-            # If DRAM is busy, wait in this state.
-            # If DRAM is available, switch to WAIT_WRITE and wait for DRAM to
-            # complete writing.
-            with m.If(~c.dram.stall()):
-                with m.Switch(c.way):
-                    for i in range(c.num_ways):
-                        with m.Case(i):
-                            c.dram.write(Cat(c.set, c.tag_array.output().tag(c.way)), c.data_array.output(i))
-                # If write policy is write-through, write to the DRAM
-                if OPTS.write_policy == wp.WRITE_THROUGH:
-                    c.dram.write_input(c.offset if c.offset_size else None, c.din_reg, c.wmask_reg if c.num_masks else None)
-                    # Read next lines from SRAMs even though the CPU is not sending
-                    # a new request since read is non-destructive.
-                    c.tag_array.read(c.addr.parse_set())
-                    c.data_array.read(c.addr.parse_set())
-
-
-    def add_wait_write(self, c, m):
-        """ Add statements for the WAIT_WRITE state. """
-
-        # In the WAIT_WRITE state, cache waits for DRAM to complete writing.
-        # When DRAM completes writing, read request is sent.
-        with m.Case(state.WAIT_WRITE):
-            c.tag_array.read(c.set)
-            c.data_array.read(c.set)
-            # If DRAM is busy, wait in this state.
-            # If DRAM completes writing, switch to WAIT_READ and wait for DRAM to
-            # complete reading.
-            with m.If(~c.dram.stall()):
-                c.dram.read(Cat(c.set, c.tag))
+        self.read_lines(c, c.set)
+        # If DRAM is busy, wait in this state.
+        # If DRAM is available, switch to READ and wait for DRAM to complete
+        # writing.
+        with m.If(c.mem_ready):
+            line = self.way_line
+            # If write policy is write-through, write the data input over the
+            # line
+            if OPTS.write_policy == wp.WRITE_THROUGH:
+                line = self.merge_request(c, line)
+            c.dram.write(c.writeback_addr, line)
+            if OPTS.write_policy == wp.WRITE_THROUGH:
+                # Read next lines from SRAMs even though the CPU is not sending
+                # a new request since read is non-destructive.
+                self.read_lines(c, c.addr_set)
 
 
     def add_read(self, c, m):
         """ Add statements for the READ state. """
 
-        # In the READ state, cache waits for DRAM to be available.
+        # In the READ state, cache waits for DRAM to be available. This is
+        # either because DRAM was busy when the miss was detected or because
+        # DRAM is still completing the write-back of a dirty line.
         # When DRAM is available, read request is sent.
-        # TODO: Is this state really necessary? WAIT_WRITE state may be used instead
-        with m.Case(state.READ):
-            c.tag_array.read(c.set)
-            c.data_array.read(c.set)
-            # If DRAM is busy, wait in this state.
-            # If DRAM completes writing, switch to WAIT_READ and wait for DRAM to
-            # complete reading.
-            with m.If(~c.dram.stall()):
-                c.dram.read(Cat(c.set, c.tag))
+        self.read_lines(c, c.set)
+        # If DRAM is busy, wait in this state.
+        # If DRAM is available, switch to WAIT_READ and wait for DRAM to
+        # complete reading.
+        with m.If(c.mem_ready):
+            c.dram.read(c.fill_addr)
 
 
     def add_wait_read(self, c, m):
@@ -207,33 +201,29 @@ class memory_controller(logic_base):
 
         # In the WAIT_READ state, cache waits for DRAM to complete reading
         # When DRAM completes reading, request is completed.
-        with m.Case(state.WAIT_READ):
-            c.tag_array.read(c.set)
-            c.data_array.read(c.set)
-            # If DRAM is busy, cache waits in this state.
-            # If DRAM completes reading, cache switches to:
-            #   IDLE    if CPU isn't sending a new request
-            #   COMPARE if CPU is sending a new request
-            with m.If(~c.dram.stall()):
-                # Update tag line
-                if c.has_dirty:
-                    c.tag_array.write(c.set, Cat(c.tag, ~c.web_reg, C(1, 1)), c.way)
-                else:
-                    c.tag_array.write(c.set, Cat(c.tag, C(1, 1)), c.way)
-                # Update data line
-                c.data_array.write(c.set, c.dram.output(), c.way)
-                # Perform the write request if data cache
-                if not OPTS.read_only:
+        self.read_lines(c, c.set)
+        # If DRAM is busy, cache waits in this state.
+        # If DRAM completes reading, cache switches to:
+        #   IDLE    if CPU isn't sending a new request
+        #   COMPARE if CPU is sending a new request
+        with m.If(c.mem_ready):
+            # Update tag line
+            if c.has_dirty:
+                m.d.comb += self.new_dirty.eq(~c.web_reg)
+            c.tag_array.write(c.set, self.new_tag_word, c.way)
+            # Update data line
+            line = c.dram.output()
+            # Perform the write request if data cache
+            if not OPTS.read_only:
+                line = Mux(c.web_reg, line, self.merge_request(c, line))
+                # If write policy is write-through, write to the DRAM
+                if OPTS.write_policy == wp.WRITE_THROUGH:
                     with m.If(~c.web_reg):
-                        c.data_array.write_input(c.way, c.offset if c.offset_size else None, c.din_reg, c.wmask_reg if c.num_masks else None)
-                        # If write policy is write-through, write to the DRAM
-                        if OPTS.write_policy == wp.WRITE_THROUGH:
-                            c.dram.write(Cat(c.set, c.tag), c.dram.output())
-                            c.dram.write_input(c.offset if c.offset_size else None, c.din_reg, c.wmask_reg if c.num_masks else None)
-                # Read next lines from SRAMs even though the CPU is not sending
-                # a new request since read is non-destructive.
-                c.tag_array.read(c.addr.parse_set())
-                c.data_array.read(c.addr.parse_set())
+                        c.dram.write(c.fill_addr, line)
+            c.data_array.write(c.set, line, c.way)
+            # Read next lines from SRAMs even though the CPU is not sending
+            # a new request since read is non-destructive.
+            self.read_lines(c, c.addr_set)
 
 
     def add_flush_hazard(self, c, m):
@@ -241,9 +231,7 @@ class memory_controller(logic_base):
 
         # In the FLUSH_HAZARD state, cache waits in this state for 1 cycle.
         # Read requests are sent to tag and data arrays.
-        with m.Case(state.FLUSH_HAZARD):
-            c.tag_array.read(0)
-            c.data_array.read(0)
+        self.read_lines(c, 0)
 
 
     def add_wait_hazard(self, c, m):
@@ -251,9 +239,7 @@ class memory_controller(logic_base):
 
         # In the WAIT_HAZARD state, cache waits in this state for 1 cycle.
         # Read requests are sent to tag and data arrays.
-        with m.Case(state.WAIT_HAZARD):
-            c.tag_array.read(c.set)
-            c.data_array.read(c.set)
+        self.read_lines(c, c.set)
 
 
     def add_flush_sig(self, c, m):
@@ -262,5 +248,17 @@ class memory_controller(logic_base):
         # If flush is high, state switches to FLUSH.
         # In the FLUSH state, cache will write all data lines back to DRAM.
         with m.If(c.flush):
-            c.tag_array.read(0)
-            c.data_array.read(0)
\ No newline at end of file
+            self.read_lines(c, 0)
+
+
+    def read_lines(self, c, address):
+        """ Send read requests to the tag and data arrays. """
+
+        c.tag_array.read(address)
+        c.data_array.read(address)
+
+
+    def merge_request(self, c, line):
+        """ Return the given data line with the request's data input written over it. """
+
+        return line.merge(c.din_reg, c.offset if c.offset_size else None, c.wmask_reg if c.num_masks else None)
\ No newline at end of file
@@ -6,7 +6,7 @@
 # All rights reserved.
 #
 from logic_base import logic_base
-from state import state
+from cache_signal import cache_signal
 from policy import write_policy as wp
 from globals import OPTS
 
@@ -24,14 +24,24 @@ class output_interface(logic_base):
         super().__init__()
 
 
+    def add_always(self, c, m):
+        """ Add statements which don't depend on the state. """
+
+        # Data line which the output word is selected from. States only choose
+        # the line so that the word is selected by a single multiplexer.
+        if c.offset_size:
+            self.dout_line = cache_signal(c.line_size)
+            self.dout_word = cache_signal(c.word_size)
+            m.d.comb += self.dout_word.eq(self.dout_line.word(c.offset))
+
+
     def add_idle(self, c, m):
         """ Add statements for the IDLE state. """
 
         # In the IDLE state, stall is low while there is no request from the CPU.
         # When there is a request, state switches to COMPARE and stall becomes
         # high in the next cycle.
-        with m.Case(state.IDLE):
-            m.d.comb += c.stall.eq(0)
+        m.d.comb += c.stall.eq(0)
 
 
     def add_compare(self, c, m):
@@ -40,19 +50,16 @@ class output_interface(logic_base):
         # In the COMPARE state, stall is low if the current request is hit.
         # Data output is valid if the request is hit and even if the current
         # request is write since read is non-destructive.
-        with m.Case(state.COMPARE):
-            for i in c.hit_detector.find_hit():
-                # If write policy is write-through, lower the stall if current request
-                # is read or DRAM is available.
-                if OPTS.write_policy == wp.WRITE_THROUGH:
-                    with m.If(c.web_reg | ~c.dram.stall()):
-                        m.d.comb += c.stall.eq(0)
-                else:
+        with c.hit_detector.check_any_hit():
+            # If write policy is write-through, lower the stall if current request
+            # is read or DRAM is available.
+            if OPTS.write_policy == wp.WRITE_THROUGH:
+                with m.If(c.web_reg | c.mem_ready):
                     m.d.comb += c.stall.eq(0)
-                if c.offset_size:
-                    m.d.comb += c.dout.eq(c.data_array.output(i).word(c.offset))
-                else:
-                    m.d.comb += c.dout.eq(c.data_array.output(i))
+            else:
+                m.d.comb += c.stall.eq(0)
+            # Only the data line of the hit way is output
+            self.output_line(c, m, c.hit_detector.hit_line)
 
 
     def add_write(self, c, m):
@@ -63,9 +70,8 @@ class output_interface(logic_base):
             return
 
         # In the WRITE state, stall is lowered.
-        with m.Case(state.WRITE):
-            with m.If(~c.dram.stall()):
-                m.d.comb += c.stall.eq(0)
+        with m.If(c.mem_ready):
+            m.d.comb += c.stall.eq(0)
 
 
     def add_wait_read(self, c, m):
@@ -75,11 +81,17 @@ class output_interface(logic_base):
         # completes the read request.
         # Data output is valid even if the current request is write since read
         # is non-destructive.
-        with m.Case(state.WAIT_READ):
-            # Check if DRAM answers to the read request
-            with m.If(~c.dram.stall()):
-                m.d.comb += c.stall.eq(0)
-                if c.offset_size:
-                    m.d.comb += c.dout.eq(c.dram.output().word(c.offset))
-                else:
-                    m.d.comb += c.dout.eq(c.dram.output())
\ No newline at end of file
+        # Check if DRAM answers to the read request
+        with m.If(c.mem_ready):
+            m.d.comb += c.stall.eq(0)
+            self.output_line(c, m, c.dram.output())
+
+
+    def output_line(self, c, m, line):
+        """ Output the requested word (or the whole line) of the given line. """
+
+        if c.offset_size:
+            m.d.comb += self.dout_line.eq(line)
+            m.d.comb += c.dout.eq(self.dout_word)
+        else:
+            m.d.comb += c.dout.eq(line)
\ No newline at end of file
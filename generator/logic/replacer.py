@@ -20,14 +20,6 @@ class replacer:
         pass
 
 
-    def add(self, c, m):
-        """ Add the replacer logic corresponding to the replacement policy. """
-
-        logic = self.get_replacer()
-        if logic:
-            logic.add(c, m)
-
-
     def get_replacer(self, **kwargs):
         """ Get the replacer logic of the replacement policy. """
 
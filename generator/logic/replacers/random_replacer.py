@@ -6,7 +6,6 @@
 # All rights reserved.
 #
 from logic_base import logic_base
-from state import state
 
 
 class random_replacer(logic_base):
@@ -19,23 +18,21 @@ class random_replacer(logic_base):
         super().__init__()
 
 
-    def add(self, c, m):
-        """ Add all sections of the always block code. """
+    def add_always(self, c, m):
+        """ Add statements which don't depend on the state. """
 
+        # Random counter is incremented at every cycle
         m.d.comb += c.random.eq(c.random + 1)
 
-        super().add(c, m)
-
 
     def add_flush(self, c, m):
         """ Add statements for the FLUSH state. """
 
         # In the FLUSH state, way register is used to write all data lines back
         # to DRAM.
-        with m.Case(state.FLUSH):
-            # If current set is clean or DRAM is available, increment the way register
-            with m.If((~c.tag_array.output().dirty(c.way) | ~c.dram.stall())):
-                m.d.comb += c.way.eq(c.way + 1)
+        # If current set is clean or DRAM is available, increment the way register
+        with m.If(c.flush_ready):
+            m.d.comb += c.way.eq(c.way + 1)
 
 
     def add_compare(self, c, m):
@@ -43,15 +40,14 @@ class random_replacer(logic_base):
 
         # In the COMPARE state, way is selected according to the replacement
         # policy of the cache.
-        with m.Case(state.COMPARE):
-            m.d.comb += c.way.eq(c.random)
-            # If there is an empty way, it must be filled before evicting the
-            # random way.
-            for i in c.hit_detector.find_empty():
-                m.d.comb += c.way.eq(i)
-            # Check if current request is a hit
-            for i in c.hit_detector.find_hit():
-                m.d.comb += c.way.eq(i)
+        m.d.comb += c.way.eq(c.random)
+        # If there is an empty way, it must be filled before evicting the
+        # random way.
+        for i in c.hit_detector.find_empty():
+            m.d.comb += c.way.eq(i)
+        # Check if current request is a hit
+        with c.hit_detector.check_any_hit():
+            m.d.comb += c.way.eq(c.hit_detector.hit_way)
 
 
     def add_flush_sig(self, c, m):
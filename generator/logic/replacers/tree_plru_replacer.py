@@ -0,0 +1,162 @@
+# See LICENSE for licensing information.
+#
+# Copyright (c) 2021 Regents of the University of California and The Board
+# of Regents for the Oklahoma Agricultural and Mechanical College
+# (acting for and on behalf of Oklahoma State University)
+# All rights reserved.
+#
+from amaranth import Cat, Mux
+from logic_base import logic_base
+from cache_signal import cache_signal
+from policy import write_policy as wp
+from globals import OPTS
+
+
+class tree_plru_replacer(logic_base):
+    """
+    This class extends base logic module for tree PLRU replacement policy.
+    """
+
+    def __init__(self):
+
+        super().__init__()
+
+
+    def add_always(self, c, m):
+        """ Add statements which don't depend on the state. """
+
+        # Ways of a set are leaves of a binary tree whose N-1 nodes are stored
+        # in the use array. Each node's bit points to the less recently used
+        # subtree. Every time a way is accessed (read or write), the nodes on
+        # its path are flipped to point away from it.
+        # New use line is built only once here. States only choose the way
+        # which is accessed.
+        self.used_way = cache_signal(c.way_size)
+        self.new_use = cache_signal(c.num_ways - 1)
+        tree = c.use_array.output()
+        nodes = []
+        for i in range(c.num_ways - 1):
+            # Level of the node and its index in that level
+            level = (i + 1).bit_length() - 1
+            index = i - (2 ** level - 1)
+            # The node is on the path if the upper bits of the way match
+            if level:
+                on_path = self.used_way[c.way_size - level:] == index
+            else:
+                on_path = 1
+            nodes.append(Mux(on_path, ~self.used_way[c.way_size - level - 1], tree[i]))
+        m.d.comb += self.new_use.eq(Cat(*nodes))
+
+
+    def add_reset(self, c, m):
+        """ Add statements for the RESET state. """
+
+        # In the RESET state, way register is used to reset all ways in tag
+        # and use lines.
+        c.use_array.write(c.set, 0)
+
+
+    def add_flush(self, c, m):
+        """ Add statements for the FLUSH state. """
+
+        # In the FLUSH state, way register is used to write all data lines
+        # back to DRAM.
+        # If current set is clean or DRAM is available, increment the way register
+        with m.If(c.flush_ready):
+            m.d.comb += c.way.eq(c.way + 1)
+
+
+    def add_idle(self, c, m):
+        """ Add statements for the IDLE state. """
+
+        # In the IDLE state, way is reset and the corresponding line from the
+        # use array is requested.
+        # Read next lines from SRAMs even though CPU is not sending a new
+        # request since read is non-destructive.
+        c.use_array.read(c.addr_set)
+
+
+    def add_compare(self, c, m):
+        """ Add statements for the COMPARE state. """
+
+        # In the COMPARE state, way is selected according to the replacement
+        # policy of the cache.
+        # Also tree bits are updated if current request is hit.
+        c.use_array.read(c.set)
+        m.d.comb += c.way.eq(c.hit_detector.evict_way)
+        # Check if current request is a hit
+        with c.hit_detector.check_any_hit():
+            m.d.comb += c.way.eq(c.hit_detector.hit_way)
+            m.d.comb += self.used_way.eq(c.hit_detector.hit_way)
+            c.use_array.write(c.set, self.new_use)
+            # Read next lines from SRAMs even if CPU is not sending a new request
+            # since read is non-destructive.
+            # If write policy is write-through, read next lines if current request
+            # is read or DRAM is available.
+            if OPTS.write_policy == wp.WRITE_THROUGH:
+                with m.If(c.web_reg | c.mem_ready):
+                    c.use_array.read(c.addr_set)
+            else:
+                c.use_array.read(c.addr_set)
+
+
+    def add_write(self, c, m):
+        """ Add statements for the WRITE state. """
+
+        # If write policy is not write-through, don't generate this state
+        if OPTS.write_policy != wp.WRITE_THROUGH:
+            return
+
+        # In the WRITE state, corresponding line from the use array is requested
+        # if DRAM is available.
+        with m.If(c.mem_ready):
+            c.use_array.read(c.addr_set)
+
+
+    def add_read(self, c, m):
+        """ Add statements for the READ state. """
+
+        # In the READ state, use line is read to update it
+        # in the WAIT_READ state.
+        c.use_array.read(c.set)
+
+
+    def add_wait_read(self, c, m):
+        """ Add statements for the WAIT_READ state. """
+
+        # In the WAIT_READ state, tree bits are updated.
+        c.use_array.read(c.set)
+        with m.If(c.mem_ready):
+            m.d.comb += self.used_way.eq(c.way)
+            c.use_array.write(c.set, self.new_use)
+            # Read next lines from SRAMs even if CPU is not sending a new request
+            # since read is non-destructive.
+            c.use_array.read(c.addr_set)
+
+
+    def add_wait_hazard(self, c, m):
+        """ Add statements for the WAIT_HAZARD state. """
+
+        # In the WAIT_HAZARD state, corresponding line from the use array is
+        # requested.
+        c.use_array.read(c.set)
+
+
+    def add_flush_sig(self, c, m):
+        """ Add flush signal control. """
+
+        # If flush is high, way is reset.
+        # way register becomes 0 since it is going to be used to write all
+        # data lines back to DRAM.
+        with m.If(c.flush):
+            m.d.comb += c.way.eq(0)
+
+
+    def add_reset_sig(self, c, m):
+        """ Add reset signal control. """
+
+        # If rst is high, way is reset and tree bits are reset.
+        # way register becomes 0 since it is going to be used to reset all
+        # ways in tag and use lines.
+        with m.If(c.rst):
+            m.d.comb += c.way.eq(0)
\ No newline at end of file
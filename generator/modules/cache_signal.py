@@ -5,7 +5,7 @@
 # (acting for and on behalf of Oklahoma State University)
 # All rights reserved.
 #
-from amaranth import Signal
+from amaranth import Signal, Cat, Repl
 from amaranth import tracer
 
 
@@ -15,9 +15,9 @@ class cache_signal(Signal):
     Common bit calculations are implemented here.
     """
 
-    def __init__(self, shape=None, name=None, reset=0, reset_less=False, is_flop=False):
+    def __init__(self, shape=None, name=None, reset=0, reset_less=False, is_flop=False, attrs=None):
 
-        super().__init__(shape=shape, name=name, reset=reset, reset_less=is_flop or reset_less)
+        super().__init__(shape=shape, name=name, reset=reset, reset_less=is_flop or reset_less, attrs=attrs)
 
         if name is None:
             # Find the declared name of this instance
@@ -113,4 +113,29 @@ class cache_signal(Signal):
     def use(self, way=0):
         """ Return use bits of a use signal. """
 
-        return self.way(way)
\ No newline at end of file
+        return self.way(way)
+
+
+    def merge(self, data, offset=None, wmask=None):
+        """ Return a data line with the given data written over it. """
+
+        # Write the whole line if neither offset nor write mask is used
+        if offset is None and wmask is None:
+            return data
+
+        # Bits of a data word (or line) which are written
+        if wmask is None:
+            data_mask = Repl(1, data.width)
+        else:
+            data_mask = Cat(*[Repl(wmask[i], cache_signal.write_size) for i in range(cache_signal.num_masks)])
+
+        # Place the word on the line according to the offset
+        if offset is None:
+            line_data = data
+            line_mask = data_mask
+        else:
+            line_data = Repl(data, cache_signal.words_per_line)
+            line_mask = Cat(*[data_mask & Repl(offset == i, cache_signal.word_size) for i in range(cache_signal.words_per_line)])
+
+        # Select data bits where the mask is set and line bits otherwise
+        return (line_data & line_mask) | (self & ~line_mask)
\ No newline at end of file
@@ -0,0 +1,54 @@
+# See LICENSE for licensing information.
+#
+# Copyright (c) 2021 Regents of the University of California and The Board
+# of Regents for the Oklahoma Agricultural and Mechanical College
+# (acting for and on behalf of Oklahoma State University)
+# All rights reserved.
+#
+from amaranth import Memory, Mux
+from sram_instance import sram_instance
+from cache_signal import cache_signal
+from globals import OPTS
+
+
+class flop_instance(sram_instance):
+    """
+    This class implements an internal array with flip-flops instead of an
+    OpenRAM SRAM module. It has the same ports and timing as SRAM instances.
+    """
+
+    def add_array(self, module_name, idx, c, m):
+        """ Add the flip-flop array to the design module. """
+
+        mem = Memory(width=self.write_din[idx].width, depth=self.num_rows, name="{0}{1}".format(module_name, idx))
+        # Read data is ready in the next cycle like SRAM arrays
+        read_port = mem.read_port(transparent=False)
+        write_port = mem.write_port()
+        m.submodules += [read_port, write_port]
+
+        m.d.comb += [
+            write_port.en.eq(~self.write_csb[idx]),
+            write_port.addr.eq(self.write_addr[idx]),
+            write_port.data.eq(self.write_din[idx]),
+            read_port.en.eq(~self.read_csb[idx]),
+            read_port.addr.eq(self.read_addr[idx]),
+        ]
+
+        # If data hazard isn't avoided by the cache, the array has to be data
+        # hazard proof. Data written to the same row in the same cycle is
+        # forwarded to the output.
+        if not OPTS.data_hazard:
+            # These flops aren't members of the design, so they are updated
+            # here like the ones in the flop block of the design.
+            forward = cache_signal(name="{0}_forward{1}".format(module_name, idx), is_flop=True)
+            forward_data = cache_signal(self.write_din[idx].width, name="{0}_forward_data{1}".format(module_name, idx), is_flop=True)
+            m.d.sync += forward.eq(forward.next, sync=True)
+            m.d.sync += forward_data.eq(forward_data.next, sync=True)
+            m.d.comb += forward.eq(forward)
+            m.d.comb += forward_data.eq(forward_data)
+            with m.If(~self.read_csb[idx]):
+                m.d.comb += forward.eq(~self.write_csb[idx] & (self.write_addr[idx] == self.read_addr[idx]))
+                m.d.comb += forward_data.eq(self.write_din[idx])
+            m.d.comb += self.read_dout[idx].eq(Mux(forward, forward_data, read_port.data))
+        else:
+            m.d.comb += self.read_dout[idx].eq(read_port.data)
\ No newline at end of file
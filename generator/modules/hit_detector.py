@@ -5,7 +5,8 @@
 # (acting for and on behalf of Oklahoma State University)
 # All rights reserved.
 #
-from amaranth import C
+from amaranth import Cat, C, Repl, Mux
+from cache_signal import cache_signal
 from policy import replacement_policy as rp
 from globals import OPTS
 
@@ -20,12 +21,66 @@ class hit_detector:
         self.c = c
         self.m = m
 
+        # Hit and dirty bits of all ways are calculated only once here and
+        # shared by all logic blocks
+        tag_dout = c.tag_array.output()
+        # Tags of all ways are compared to the request's tag with a single wide
+        # XOR. A way's tag matches if its part of the result is all zeros.
+        self.tag_diff = cache_signal(c.tag_size * c.num_ways)
+        m.d.comb += self.tag_diff.eq(Cat(*[tag_dout.tag(i) for i in range(c.num_ways)]) ^ Repl(c.tag, c.num_ways))
+        self.way_hit = cache_signal(c.num_ways)
+        m.d.comb += self.way_hit.eq(Cat(*[tag_dout.valid(i) & ~self.tag_diff.word_select(i, c.tag_size).any() for i in range(c.num_ways)]))
+        # Request is hit if any of the ways is hit
+        self.hit = cache_signal()
+        m.d.comb += self.hit.eq(self.way_hit.any())
+        # Encoded number of the hit way and its data line. They are only
+        # meaningful if request is hit.
+        if OPTS.replacement_policy == rp.NONE:
+            self.hit_way = 0
+        else:
+            self.hit_way = cache_signal(c.way_size)
+            for i in range(c.num_ways):
+                with self.check_hit(i):
+                    m.d.comb += self.hit_way.eq(i)
+        self.hit_line = cache_signal(c.line_size)
+        m.d.comb += self.hit_line.eq(Cat(*[c.data_array.output(i) for i in range(c.num_ways)]).word_select(self.hit_way, c.line_size))
+        # Instruction caches don't have dirty bit
+        if c.has_dirty:
+            self.way_dirty = cache_signal(c.num_ways)
+            m.d.comb += self.way_dirty.eq(Cat(*[tag_dout.valid(i) & tag_dout.dirty(i) for i in range(c.num_ways)]))
+        # Way to be evicted is encoded only once here for the policies which
+        # need to search the use line for it
+        if OPTS.replacement_policy == rp.LRU:
+            self.evict_way = cache_signal(c.way_size)
+            # The way whose use number is 0 is the least recently used
+            for i in range(c.num_ways):
+                with m.If(c.use_array.output().use(i) == C(0, c.way_size)):
+                    m.d.comb += self.evict_way.eq(i)
+        if OPTS.replacement_policy == rp.PLRU:
+            self.evict_way = cache_signal(c.way_size)
+            # The first way whose MRU bit isn't set is evicted. Ways are
+            # checked in the reverse order so that the first way overrides
+            # the others.
+            for i in reversed(range(c.num_ways)):
+                with m.If(~c.use_array.output().use(i)):
+                    m.d.comb += self.evict_way.eq(i)
+        if OPTS.replacement_policy == rp.TREE_PLRU:
+            self.evict_way = cache_signal(c.way_size)
+            # The way is found by walking down the tree
+            m.d.comb += self.evict_way.eq(self.walk_tree(c.use_array.output()))
+
 
     def check_hit(self, way=0):
         """ Return Amaranth context manager instance to check hit. """
 
         # Request is hit if valid bit is set and address' tag matches the way's tag
-        return self.m.If(self.c.tag_array.output().valid(way) & (self.c.tag_array.output().tag(way) == self.c.tag))
+        return self.m.If(self.way_hit[way])
+
+
+    def check_any_hit(self):
+        """ Return Amaranth context manager instance to check hit in any way. """
+
+        return self.m.If(self.hit)
 
 
     def check_clean_miss(self):
@@ -43,16 +98,7 @@ class hit_detector:
         """ Return Amaranth context manager instance to check dirty miss. """
 
         # Assume dirty miss if valid and dirty bits of the way are set
-        return self.m.If(self.c.tag_array.output().valid(way) & self.c.tag_array.output().dirty(way))
-
-
-    def find_hit(self):
-        """ Return the way hit and wrap the statements accordingly. """
-
-        if OPTS.replacement_policy == rp.NONE:
-            return self.find_hit_direct()
-        else:
-            return self.find_hit_n_way()
+        return self.m.If(self.way_dirty.bit_select(way, 1))
 
 
     def find_miss(self):
@@ -64,11 +110,11 @@ class hit_detector:
         if OPTS.replacement_policy == rp.NONE:
             return self.find_miss_none()
         elif OPTS.replacement_policy == rp.FIFO:
-            return self.find_miss_fifo()
-        elif OPTS.replacement_policy == rp.LRU:
-            return self.find_miss_lru()
+            return self.find_miss_way(self.c.use_array.output())
         elif OPTS.replacement_policy == rp.RANDOM:
-            return self.find_miss_random()
+            return self.find_miss_way(self.c.random)
+        else:
+            return self.find_miss_way(self.evict_way)
 
 
     def find_empty(self):
@@ -80,21 +126,6 @@ class hit_detector:
                     yield i
 
 
-    def find_hit_direct(self):
-        """ Return the way hit for direct-mapped caches. """
-
-        with self.check_hit():
-            yield 0
-
-
-    def find_hit_n_way(self):
-        """ Return the way hit for N-way set associative caches. """
-
-        for i in range(self.c.num_ways):
-            with self.check_hit(i):
-                yield i
-
-
     def find_miss_none(self):
         """ Return the way missed for direct-mapped caches. """
 
@@ -106,13 +137,14 @@ class hit_detector:
             yield False, 0
 
 
-    def find_miss_fifo(self):
-        """ Return the way missed for FIFO caches. """
+    def find_miss_way(self, way):
+        """ Return the way missed for N-way caches given the way to evict. """
 
+        # Only the dirty bit of the way to be evicted is checked
         # Instruction caches don't have dirty bit
         if self.c.has_dirty:
-            with self.check_dirty_miss(self.c.use_array.output()):
-                with self.m.Switch(self.c.use_array.output()):
+            with self.check_dirty_miss(way):
+                with self.m.Switch(way):
                     for i in range(self.c.num_ways):
                         with self.m.Case(i):
                             yield True, i
@@ -120,28 +152,14 @@ class hit_detector:
             yield False, 0
 
 
-    def find_miss_lru(self):
-        """ Return the way missed for LRU caches. """
-
-        for i in range(self.c.num_ways):
-            with self.m.If(self.c.use_array.output().use(i) == C(0, self.c.way_size)):
-                # Instruction caches don't have dirty bit
-                if self.c.has_dirty:
-                    with self.check_dirty_miss(i):
-                        yield True, i
-                with self.check_clean_miss():
-                    yield False, i
-
+    def walk_tree(self, tree, node=0):
+        """ Return the way pointed by the subtree of a PLRU tree. """
 
-    def find_miss_random(self):
-        """ Return the way missed for random caches. """
-
-        # Instruction caches don't have dirty bit
-        if self.c.has_dirty:
-            with self.check_dirty_miss(self.c.random):
-                with self.m.Switch(self.c.random):
-                    for i in range(self.c.num_ways):
-                        with self.m.Case(i):
-                            yield True, i
-        with self.check_clean_miss():
-            yield False, 0
\ No newline at end of file
+        # Each node's bit points to the subtree which is less recently used.
+        # Children of a node are stored at (2 * node + 1) and (2 * node + 2).
+        # The bit of each visited node is the next bit of the way number.
+        if 2 * node + 1 >= self.c.num_ways - 1:
+            return tree[node]
+        left = self.walk_tree(tree, 2 * node + 1)
+        right = self.walk_tree(tree, 2 * node + 2)
+        return Cat(Mux(tree[node], right, left), tree[node])
\ No newline at end of file
@@ -49,21 +49,27 @@ class sram_instance:
             self.read_dout.append(cache_signal(real_row_size, name="{0}_read_dout{1}".format(short_name, i)))
 
             # Add this instance to the design module
-            m.submodules += Instance(module_name,
-                ("i", "clk0", c.clk),
-                ("i", "csb0", self.write_csb[i]),
-                ("i", "addr0", self.write_addr[i]),
-                ("i", "din0", self.write_din[i]),
-                ("i", "clk1", c.clk),
-                ("i", "csb1", self.read_csb[i]),
-                ("i", "addr1", self.read_addr[i]),
-                ("o", "dout1", self.read_dout[i]),
-            )
+            self.add_array(module_name, i, c, m)
 
         # Keep the design module for later use
         self.m = m
 
 
+    def add_array(self, module_name, idx, c, m):
+        """ Add the SRAM module instance of an array to the design module. """
+
+        m.submodules += Instance(module_name,
+            ("i", "clk0", c.clk),
+            ("i", "csb0", self.write_csb[idx]),
+            ("i", "addr0", self.write_addr[idx]),
+            ("i", "din0", self.write_din[idx]),
+            ("i", "clk1", c.clk),
+            ("i", "csb1", self.read_csb[idx]),
+            ("i", "addr1", self.read_addr[idx]),
+            ("o", "dout1", self.read_dout[idx]),
+        )
+
+
     def input(self, way=0):
         """ Return the input signal. """
 
@@ -81,8 +87,10 @@ class sram_instance:
 
         # Read the same address from all arrays
         for i in range(self.num_arrays):
-            self.m.d.comb += self.read_csb[i].eq(0)
-            self.m.d.comb += self.read_addr[i].eq(address)
+            self.m.d.comb += [
+                self.read_csb[i].eq(0),
+                self.read_addr[i].eq(address),
+            ]
 
 
     def write_local(self, address, data, way, is_reset=False):
@@ -94,9 +102,11 @@ class sram_instance:
             idx = 0
 
         # TODO: Use wmask feature of OpenRAM
-        self.m.d.comb += self.write_csb[idx].eq(0)
-        self.m.d.comb += self.write_addr[idx].eq(address)
-        self.m.d.comb += self.write_din[idx].eq(self.read_dout[idx])
+        self.m.d.comb += [
+            self.write_csb[idx].eq(0),
+            self.write_addr[idx].eq(address),
+            self.write_din[idx].eq(self.read_dout[idx]),
+        ]
         if self.num_arrays > 1 or is_reset:
             self.m.d.comb += self.write_din[idx].eq(data)
         else:
@@ -110,6 +120,10 @@ class sram_instance:
         if way is None:
             for i in range(self.num_arrays):
                 self.write_local(address, data, i, True)
+        # If way is a signal and there is only one array, select the way part
+        # of the signal with the way signal
+        elif isinstance(way, cache_signal) and self.num_arrays == 1:
+            self.write_local(address, data, way)
         # If way is a signal, wrap it with case statements
         elif isinstance(way, cache_signal):
             with self.m.Switch(way):
@@ -118,59 +132,4 @@ class sram_instance:
                         self.write_local(address, data, i)
         # If way is a constant, calculate the way part of the signal
         else:
-            self.write_local(address, data, way)
-
-
-    def write_input_local(self, way, word, data, wmask):
-        """ Add input data to write request to SRAM. """
-
-        # Write the word over the write mask
-        for mask_idx in range(sram_instance.num_masks):
-            with self.m.If(wmask[mask_idx]):
-                if word is None:
-                    self.m.d.comb += self.write_din[way].mask(mask_idx).eq(data.mask(mask_idx))
-                else:
-                    self.m.d.comb += self.write_din[way].mask(mask_idx, word).eq(data.mask(mask_idx))
-
-        # Write the whole word if write mask is not used
-        if not sram_instance.num_masks:
-            if word is None:
-                self.m.d.comb += self.write_din[way].eq(data)
-            else:
-                self.m.d.comb += self.write_din[way].word(word).eq(data)
-
-
-    def find_way(self, way):
-        """ Return all way indices corresponding to the given way value. """
-
-        if not isinstance(way, cache_signal):
-            yield way
-        else:
-            with self.m.Switch(way):
-                for way_idx in range(sram_instance.num_ways):
-                    with self.m.Case(way_idx):
-                        yield way_idx
-
-
-    def find_word(self, offset):
-        """ Return all word indices corresponding to the given offset value. """
-
-        if offset is None:
-            yield None
-        else:
-            with self.m.Switch(offset):
-                for word_idx in range(sram_instance.words_per_line):
-                    with self.m.Case(word_idx):
-                        yield word_idx
-
-
-    def write_input(self, way, offset, data, wmask=None):
-        """ Add input data to write request to SRAM. """
-
-        # NOTE: These switch statements are written manually (not only with
-        # word_select) because word_select fails to generate correct case
-        # statements if offset calculation is a bit complex.
-
-        for way_idx in self.find_way(way):
-            for word_idx in self.find_word(offset):
-                self.write_input_local(way_idx, word_idx, data, wmask)
\ No newline at end of file
+            self.write_local(address, data, way)
\ No newline at end of file
@@ -49,6 +49,10 @@ class options(optparse.Values):
     # can be set False.
     data_hazard = True
 
+    # Use array can be implemented with flip-flops instead of an OpenRAM SRAM
+    # array. This might be better for small caches since use arrays are narrow.
+    use_array_flops = False
+
     # Define the output file paths
     output_path = "outputs/"
     # Define the output file base name
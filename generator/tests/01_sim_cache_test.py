@@ -45,6 +45,16 @@ class sim_cache_test(opencache_test):
         OPTS.replacement_policy = rp.RANDOM
         self.run_all_tests()
 
+        # Run tests for 4-way PLRU
+        OPTS.num_ways = 4
+        OPTS.replacement_policy = rp.PLRU
+        self.run_all_tests()
+
+        # Run tests for 4-way tree PLRU
+        OPTS.num_ways = 4
+        OPTS.replacement_policy = rp.TREE_PLRU
+        self.run_all_tests()
+
         globals.end_opencache()
 
 
@@ -62,6 +72,10 @@ class sim_cache_test(opencache_test):
             self.check_true(check_lru(sc))
         if OPTS.replacement_policy == rp.RANDOM:
             self.check_true(check_random(sc))
+        if OPTS.replacement_policy == rp.PLRU:
+            self.check_true(check_plru(sc))
+        if OPTS.replacement_policy == rp.TREE_PLRU:
+            self.check_true(check_tree_plru(sc))
 
 
 def setup_sim_cache():
@@ -255,6 +269,65 @@ def check_random(sc):
     return True
 
 
+def check_plru(sc):
+    """ Check PLRU replacement of sim_cache. """
+
+    sc.reset()
+
+    # Setup 5 addresses with different tags but in the same set
+    address = [sc.merge_address(i, 0, 0) for i in range(5)]
+
+    # Write different data to each address
+    for i in range(5):
+        sc.write(address[i], "1111", i + 1)
+
+    # address[0] must be evicted
+    if sc.find_way(address[0]) is not None:
+        return False
+
+    sc.read(address[1])
+    sc.read(address[0])
+
+    # address[2] must be evicted
+    if sc.find_way(address[2]) is not None:
+        return False
+
+    return True
+
+
+def check_tree_plru(sc):
+    """ Check tree PLRU replacement of sim_cache. """
+
+    sc.reset()
+
+    # Setup 5 addresses with different tags but in the same set
+    address = [sc.merge_address(i, 0, 0) for i in range(5)]
+
+    # Write different data to each address
+    for i in range(5):
+        sc.write(address[i], "1111", i + 1)
+
+    # address[0] must be evicted
+    if sc.find_way(address[0]) is not None:
+        return False
+
+    sc.read(address[1])
+    sc.read(address[0])
+
+    # address[2] must be evicted
+    if sc.find_way(address[2]) is not None:
+        return False
+
+    sc.read(address[4])
+    sc.read(address[2])
+
+    # address[3] must be evicted
+    if sc.find_way(address[3]) is not None:
+        return False
+
+    return True
+
+
 # Run the test from the terminal
 if __name__ == "__main__":
     (OPTS, args) = globals.parse_args()
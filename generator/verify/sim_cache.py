@@ -101,15 +101,9 @@ class sim_cache:
     def merge_address(self, tag_decimal, set_decimal, offset_decimal):
         """ Create the address consists of given tag, set, and offset values. """
 
-        tag_binary = "{0:0{1}b}".format(tag_decimal, self.tag_size)
-        set_binary = "{0:0{1}b}".format(set_decimal, self.set_size)
+        address_decimal = (tag_decimal << self.set_size) + set_decimal
         if self.offset_size:
-            offset_binary = "{0:0{1}b}".format(offset_decimal, self.offset_size)
-        else:
-            offset_binary = ""
-
-        address_binary = tag_binary + set_binary + offset_binary
-        address_decimal = int(address_binary, 2)
+            address_decimal = (address_decimal << self.offset_size) + offset_decimal
 
         return address_decimal
 
@@ -117,35 +111,29 @@ class sim_cache:
     def parse_address(self, address):
         """ Parse the given address into tag, set, and offset values. """
 
-        address_binary = "{0:0{1}b}".format(address, self.address_size)
-        tag_binary = address_binary[:self.tag_size]
-        set_binary = address_binary[self.tag_size:self.tag_size + self.set_size]
-        offset_binary = address_binary[-self.offset_size:]
-
-        tag_decimal = int(tag_binary, 2)
-        set_decimal = int(set_binary, 2)
+        tag_decimal = address >> (self.set_size + self.offset_size)
+        set_decimal = (address >> self.offset_size) % (2 ** self.set_size)
         if self.offset_size:
-            offset_decimal = int(offset_binary, 2)
+            offset_decimal = address % (2 ** self.offset_size)
         else:
             offset_decimal = None
 
         return (tag_decimal, set_decimal, offset_decimal)
 
 
-    def find_way(self, address):
+    def find_way(self, address, parsed=None):
         """ Find the way which has the given address' data. """
 
-        tag_decimal, set_decimal, _ = self.parse_address(address)
-        for way in range(self.num_ways):
-            if self.sram.read_valid(set_decimal, way) and self.sram.read_tag(set_decimal, way) == tag_decimal:
-                return way
+        tag_decimal, set_decimal, _ = parsed or self.parse_address(address)
+        return self.sram.find_tag(set_decimal, tag_decimal)
 
 
     def is_dirty(self, address):
         """ Return the dirty bit of the given address. """
 
-        _, set_decimal, _ = self.parse_address(address)
-        way = self.find_way(address)
+        parsed = self.parse_address(address)
+        _, set_decimal, _ = parsed
+        way = self.find_way(address, parsed)
         if way is not None:
             return self.sram.read_dirty(set_decimal, way)
 
@@ -175,19 +163,34 @@ class sim_cache:
                 way = self.random
             return way
 
+        if OPTS.replacement_policy == rp.PLRU:
+            for i in range(self.num_ways):
+                if not self.sram.read_plru(set_decimal, i):
+                    return i
+
+        if OPTS.replacement_policy == rp.TREE_PLRU:
+            # Follow the tree bits from the root to a leaf
+            node = 0
+            while node < self.num_ways - 1:
+                node = 2 * node + 1 + self.sram.read_tree(set_decimal, node)
+            return node - (self.num_ways - 1)
+
 
-    def request(self, address):
+    def request(self, address, parsed=None):
         """ Prepare arrays for a request of address. """
 
-        tag_decimal, set_decimal, _ = self.parse_address(address)
-        way = self.find_way(address)
+        parsed = parsed or self.parse_address(address)
+        tag_decimal, set_decimal, _ = parsed
+        way = self.find_way(address, parsed)
         way_evict = None
 
         # Increment the random counter if cache enters WAIT_HAZARD
-        self.add_cycles(int(self.is_data_hazard(address)))
+        self.add_cycles(int(self.is_data_hazard(address, parsed)))
 
         if way is not None: # Hit
             self.update_lru(set_decimal, way)
+            self.update_plru(set_decimal, way)
+            self.update_tree(set_decimal, way)
         else: # Miss
             way_evict = self.way_to_evict(set_decimal)
 
@@ -208,6 +211,8 @@ class sim_cache:
 
             self.update_fifo(set_decimal)
             self.update_lru(set_decimal, way_evict)
+            self.update_plru(set_decimal, way_evict)
+            self.update_tree(set_decimal, way_evict)
             self.add_cycles(1 + DRAM_DELAY)
 
         # Update previous request variables
@@ -224,8 +229,9 @@ class sim_cache:
     def read(self, address):
         """ Read data from an address. """
 
-        _, set_decimal, offset_decimal = self.parse_address(address)
-        way = self.request(address)
+        parsed = self.parse_address(address)
+        _, set_decimal, offset_decimal = parsed
+        way = self.request(address, parsed)
         self.add_cycles(1)
         # If returning a data word
         if self.offset_size:
@@ -243,8 +249,9 @@ class sim_cache:
     def write(self, address, mask, data_input):
         """ Write data to an address. """
 
-        tag_decimal, set_decimal, offset_decimal = self.parse_address(address)
-        way = self.request(address)
+        parsed = self.parse_address(address)
+        tag_decimal, set_decimal, offset_decimal = parsed
+        way = self.request(address, parsed)
         if self.has_dirty:
             self.sram.write_dirty(set_decimal, way, 1)
 
@@ -259,12 +266,13 @@ class sim_cache:
             for word in self.sram.read_line(set_decimal, way):
                 orig_data += word << (idx * self.word_size)
                 idx += 1
-        wr_data = 0 if self.num_masks else data_input
+        wr_data = data_input
 
-        for i in range(self.num_masks):
-            part = data_input if mask[-(i + 1)] == "1" else orig_data
-            part = (part >> (i * self.write_size)) % (2 ** self.write_size)
-            wr_data += part << (i * self.write_size)
+        if self.num_masks:
+            # Expand each bit of the write mask to its part and merge both
+            # data at once
+            bit_mask = int("".join(bit * self.write_size for bit in mask), 2)
+            wr_data = (data_input & bit_mask) | (orig_data & ~bit_mask)
 
         # If returning a data word
         if self.offset_size:
@@ -298,7 +306,8 @@ class sim_cache:
     def stall_cycles(self, address, is_write):
         """ Return the number of stall cycles for a request of address. """
 
-        hazard = self.is_data_hazard(address)
+        parsed = self.parse_address(address)
+        hazard = self.is_data_hazard(address, parsed)
 
         # In order to calculate the stall cycles correctly, random counter
         # needs to be updated temporarily here.
@@ -312,7 +321,7 @@ class sim_cache:
         # Don't add an extra cycle here if DRAM's stall is non-zero.
         cycles = int(hazard and self.dram_stalls == 0)
 
-        if self.find_way(address) is None:
+        if self.find_way(address, parsed) is None:
             # Stalls 1 cycle in the COMPARE state since the request is a miss
             cycles += 1
 
@@ -321,7 +330,7 @@ class sim_cache:
             cycles += self.dram_stalls
 
             # Find the evicted address
-            _, set_decimal, _ = self.parse_address(address)
+            _, set_decimal, _ = parsed
             evicted_way = self.way_to_evict(set_decimal)
             is_dirty = self.sram.read_dirty(set_decimal, evicted_way)
 
@@ -345,24 +354,24 @@ class sim_cache:
         return cycles
 
 
-    def is_data_hazard(self, address):
+    def is_data_hazard(self, address, parsed=None):
         """ Return whether a data hazard is detected. """
 
         # Return false if data_hazard is disabled
         if not OPTS.data_hazard:
             return False
 
-        _, set_decimal, _ = self.parse_address(address)
+        _, set_decimal, _ = parsed or self.parse_address(address)
 
         # No data hazard if this is the first request or current request is not
         # in the same set with the previous request
         if self.prev_set is None or set_decimal != self.prev_set:
             return False
 
-        if OPTS.replacement_policy == rp.LRU:
-            # In LRU cache, use bits are updated in each access.
+        if OPTS.replacement_policy.updated_after_read():
+            # In LRU and PLRU caches, use bits are updated in each access.
             # Therefore, when there are two requests to the same set, data
-            # hazard on LRU SRAM might occur.
+            # hazard on the use array might occur.
             return True
         else:
             # If previous request was hit and write If previous request was miss
@@ -399,12 +408,42 @@ class sim_cache:
             # When a way is accessed (read or write), it is brought to the top
             # of the order (highest possible number) and numbers which are more
             # than its previous value are decreased by one.
+            way_lru = self.sram.read_lru(set_decimal, way)
             for i in range(self.num_ways):
-                if self.sram.read_lru(set_decimal, i) > self.sram.read_lru(set_decimal, way):
+                if self.sram.read_lru(set_decimal, i) > way_lru:
                     self.sram.write_lru(set_decimal, i, self.sram.read_lru(set_decimal, i) - 1)
             self.sram.write_lru(set_decimal, way, self.num_ways - 1)
 
 
+    def update_plru(self, set_decimal, way):
+        """ Update the PLRU bits of the latest used way. """
+
+        # Check if replacement policy matches
+        if OPTS.replacement_policy == rp.PLRU:
+            # There is an MRU bit for each way in a set.
+            # When a way is accessed (read or write), its MRU bit is set. If
+            # all MRU bits become set, all of them are cleared except the
+            # accessed way's.
+            self.sram.write_plru(set_decimal, way, 1)
+            if all(self.sram.read_plru(set_decimal, i) for i in range(self.num_ways)):
+                for i in range(self.num_ways):
+                    self.sram.write_plru(set_decimal, i, int(i == way))
+
+
+    def update_tree(self, set_decimal, way):
+        """ Update the PLRU tree bits on the path of the latest used way. """
+
+        # Check if replacement policy matches
+        if OPTS.replacement_policy == rp.TREE_PLRU:
+            # Ways are the leaves of the tree. Walk up from the used way's
+            # leaf and make each node point to the other subtree.
+            node = way + self.num_ways - 1
+            while node:
+                parent = (node - 1) // 2
+                self.sram.write_tree(set_decimal, parent, int(node == 2 * parent + 1))
+                node = parent
+
+
     def update_random(self, cycles):
         """ Update the random counter for a number of cycles. """
 
@@ -30,11 +30,8 @@ class sim_dram:
     def make_initial_data(self):
         """ Prepare the intial data in the memory. """
 
-        self.data_array = []
-        for _ in range(self.num_rows):
-            self.data_array.append([])
-            for _ in range(self.num_words):
-                self.data_array[-1].append(randrange(2 ** self.word_size))
+        max_word = 2 ** self.word_size
+        self.data_array = [[randrange(max_word) for _ in range(self.num_words)] for _ in range(self.num_rows)]
 
 
     def read_line(self, address):
@@ -25,14 +25,19 @@ class sim_sram:
     def reset(self):
         """ Reset all arrays of the SRAM. """
 
-        self.valid_array = [[0] * self.num_ways for _ in range(self.num_rows)]
-        self.dirty_array = [[0] * self.num_ways for _ in range(self.num_rows)]
+        # Valid and dirty bits are stored as bytes
+        self.valid_array = [bytearray(self.num_ways) for _ in range(self.num_rows)]
+        self.dirty_array = [bytearray(self.num_ways) for _ in range(self.num_rows)]
         self.tag_array = [[0] * self.num_ways for _ in range(self.num_rows)]
         self.data_array = [[[0] * self.num_words for _ in range(self.num_ways)] for _ in range(self.num_rows)]
         if OPTS.replacement_policy == rp.FIFO:
             self.fifo_array = [0] * self.num_rows
         if OPTS.replacement_policy == rp.LRU:
             self.lru_array = [[0] * self.num_ways for _ in range(self.num_rows)]
+        if OPTS.replacement_policy == rp.PLRU:
+            self.plru_array = [[0] * self.num_ways for _ in range(self.num_rows)]
+        if OPTS.replacement_policy == rp.TREE_PLRU:
+            self.tree_array = [[0] * (self.num_ways - 1) for _ in range(self.num_rows)]
 
 
     def read_valid(self, set, way):
@@ -65,6 +70,26 @@ class sim_sram:
         return self.lru_array[set][way]
 
 
+    def read_plru(self, set, way):
+        """ Return the PLRU bit of given set and way. """
+
+        return self.plru_array[set][way]
+
+
+    def read_tree(self, set, node):
+        """ Return the PLRU tree bit of given set and node. """
+
+        return self.tree_array[set][node]
+
+
+    def find_tag(self, set, tag):
+        """ Return the valid way of given set which has the given tag. """
+
+        for way, (valid, way_tag) in enumerate(zip(self.valid_array[set], self.tag_array[set])):
+            if valid and way_tag == tag:
+                return way
+
+
     def read_word(self, set, way, offset):
         """ Return the data word of given set, way, and offset. """
 
@@ -107,6 +132,18 @@ class sim_sram:
         self.lru_array[set][way] = data
 
 
+    def write_plru(self, set, way, data):
+        """ Write the PLRU bit of given set and way. """
+
+        self.plru_array[set][way] = data
+
+
+    def write_tree(self, set, node, data):
+        """ Write the PLRU tree bit of given set and node. """
+
+        self.tree_array[set][node] = data
+
+
     def write_word(self, set, way, offset, data):
         """ Write the data word of given set, way, and offset. """
 
@@ -5,7 +5,7 @@
 # (acting for and on behalf of Oklahoma State University)
 # All rights reserved.
 #
-from random import randrange, choice
+from random import randrange, choice, shuffle
 from globals import OPTS
 
 
@@ -53,9 +53,9 @@ class test_data:
                     addresses.append(self.addr[i])
 
             # Read from random addresses which are written to in the first half
-            while len(addresses) > 0:
-                self.add_operation("read", addresses)
-                addresses.remove(self.addr[-1])
+            shuffle(addresses)
+            for address in addresses:
+                self.add_operation("read", address)
         else:
             # Read random data from random addresses
             for i in range(test_size):
@@ -66,7 +66,7 @@ class test_data:
             self.run_sim_cache(i)
 
 
-    def add_operation(self, op, addr_list=None):
+    def add_operation(self, op, address=None):
         """ Add a new operation with random address and data. """
 
         # Operation
@@ -75,14 +75,14 @@ class test_data:
         self.web.append(int(op != "write"))
 
         # Address
-        if addr_list is None:
+        if address is None:
             random_tag = randrange(2 ** self.tag_size)
             # Write to first two sets only so that we can test replacement
             random_set = randrange(2)
             random_offset = randrange(2 ** self.offset_size)
             self.addr.append(self.sc.merge_address(random_tag, random_set, random_offset))
         else:
-            self.addr.append(choice(addr_list))
+            self.addr.append(address)
 
         if op == "write":
             # Write mask
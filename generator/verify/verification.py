@@ -6,10 +6,10 @@
 # All rights reserved.
 #
 import os
+import re
 import datetime
 from shutil import copyfile
-from subprocess import call, DEVNULL, STDOUT
-from re import findall
+from subprocess import call, Popen, DEVNULL, STDOUT
 from .core import core
 from .test_bench import test_bench
 from .test_data import test_data
@@ -17,6 +17,9 @@ from .sim_cache import sim_cache
 import debug
 from globals import OPTS, print_time
 
+# Error count is the number following this prefix in the Yosys log
+_ERR_RE = re.compile(r"found and reported\s+(\d+)")
+
 
 class verification:
     """
@@ -101,10 +104,10 @@ class verification:
 
         # Convert SRAM modules to blackbox
         debug.info(1, "Converting OpenRAM modules to blackbox...")
-        self.convert_to_blacbox(OPTS.temp_path + OPTS.tag_array_name + ".v")
-        self.convert_to_blacbox(OPTS.temp_path + OPTS.data_array_name + ".v")
+        self.convert_to_blackbox(OPTS.temp_path + OPTS.tag_array_name + ".v")
+        self.convert_to_blackbox(OPTS.temp_path + OPTS.data_array_name + ".v")
         if OPTS.replacement_policy.has_sram_array():
-            self.convert_to_blacbox(OPTS.temp_path + OPTS.use_array_name + ".v")
+            self.convert_to_blackbox(OPTS.temp_path + OPTS.use_array_name + ".v")
 
         # Run FuseSoc for synthesis
         debug.info(1, "Running FuseSoC for synthesis...")
@@ -130,40 +133,39 @@ class verification:
         copyfile(OPTS.output_path + self.name + ".v", cache_path)
 
         if OPTS.run_openram:
-            # Copy the configuration files
-            debug.info(1, "Copying the config files to the temp subfolder")
-            self.copy_config_file(OPTS.data_array_name + "_config.py", OPTS.temp_path)
-            self.copy_config_file(OPTS.tag_array_name + "_config.py", OPTS.temp_path)
-
+            array_names = [OPTS.data_array_name, OPTS.tag_array_name]
             # Random replacement policy doesn't need a separate SRAM array
             if OPTS.replacement_policy.has_sram_array():
-                self.copy_config_file(OPTS.use_array_name + "_config.py", OPTS.temp_path)
-
-            # Run OpenRAM to generate Verilog files of SRAMs
-            debug.info(1, "Running OpenRAM for the data array...")
-            self.run_openram("{}_config.py".format(OPTS.temp_path + OPTS.data_array_name))
+                array_names.append(OPTS.use_array_name)
+            config_names = [x + "_config.py" for x in array_names]
 
-            debug.info(1, "Running OpenRAM for the tag array...")
-            self.run_openram("{}_config.py".format(OPTS.temp_path + OPTS.tag_array_name))
+            # Copy the configuration files
+            debug.info(1, "Copying the config files to the temp subfolder")
+            for config_name in config_names:
+                self.copy_config_file(config_name, OPTS.temp_path)
 
-            # Random replacement policy doesn't need a separate SRAM array
-            if OPTS.replacement_policy.has_sram_array():
-                debug.info(1, "Running OpenRAM for the use array...")
-                self.run_openram("{}_config.py".format(OPTS.temp_path + OPTS.use_array_name))
+            # Run OpenRAM to generate Verilog files of SRAMs
+            debug.info(1, "Running OpenRAM for {}...".format(", ".join(array_names)))
+            self.run_openram([OPTS.temp_path + x for x in config_names])
         else:
             debug.info(1, "Skipping to run OpenRAM")
 
 
-    def run_openram(self, config_path):
+    def run_openram(self, config_paths):
         """ Run OpenRAM to generate Verilog modules. """
 
         openram_command = "python3 $OPENRAM_HOME/openram.py"
 
-        if call("{0} {1}".format(openram_command, config_path),
-                cwd=OPTS.temp_path,
-                shell=True,
-                stdout=self.stdout,
-                stderr=self.stderr) != 0:
+        # SRAM arrays are written to different files, so OpenRAM can generate
+        # all of them at the same time
+        processes = [Popen("{0} {1}".format(openram_command, config_path),
+                           cwd=OPTS.temp_path,
+                           shell=True,
+                           stdout=self.stdout,
+                           stderr=self.stderr) for config_path in config_paths]
+
+        # Wait for all processes before checking their return codes
+        if any([p.wait() != 0 for p in processes]):
             debug.error("OpenRAM failed!", -1)
 
         if not OPTS.keep_openram_files:
@@ -225,7 +227,7 @@ class verification:
         new_file.close()
 
 
-    def convert_to_blacbox(self, file_path):
+    def convert_to_blackbox(self, file_path):
         """ Convert the given Verilog module file to blackbox. """
 
         keep = []
@@ -233,14 +235,12 @@ class verification:
         bb_file_path = file_path[:-2] + "_bb.v"
 
         with open(file_path, "r") as f:
-            delete = False
-
             for line in f:
+                # Rest of the module is deleted starting from the first register
                 if line.lstrip().startswith("reg"):
-                    delete = True
+                    break
 
-                if not delete:
-                    keep.append(line)
+                keep.append(line)
 
         keep.append("endmodule\n")
 
@@ -252,8 +252,6 @@ class verification:
     def check_synth_result(self, path, file_name):
         """ Read the log file of the simulation. """
 
-        error_prefix = "found and reported"
-
         # Check the error count lines
         with open("{0}build/{1}/syn-yosys/{2}".format(path,
                                                       self.core.core_name.replace(":", "_"),
@@ -261,7 +259,8 @@ class verification:
             for line in f:
                 # TODO: How to check whether the synthesis was successful?
                 # Check if error count is nonzero
-                if line.find(error_prefix) != -1 and int(findall(r"\d+", line)[0]) != 0:
+                match = _ERR_RE.search(line)
+                if match and int(match.group(1)) != 0:
                     debug.error("Synthesis failed!", -1)
                 # Check if there is an "ERROR"
                 if line.find("ERROR") != -1:
@@ -272,13 +271,15 @@ class verification:
     def check_sim_result(self, path, file_name):
         """ Read the log file of the simulation. """
 
-        # Result of the simulation is supposed to be at the end of the log file
+        # Result of the simulation is supposed to be at the end of the log file.
+        # Only the end of the file is read since the log can be large.
         with open("{0}build/{1}/sim-icarus/{2}".format(path,
                                                        self.core.core_name.replace(":", "_"),
-                                                       file_name)) as f:
-            for line in f:
-                pass
-            if line.rstrip() == self.tb.success_message:
-                debug.info(1, "Simulation successful.")
-            else:
-                debug.error("Simulation failed!", -1)
\ No newline at end of file
+                                                       file_name), "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(f.tell() - 4096, 0))
+            lines = f.read().decode(errors="ignore").splitlines()
+        if lines and lines[-1].rstrip() == self.tb.success_message:
+            debug.info(1, "Simulation successful.")
+        else:
+            debug.error("Simulation failed!", -1)
\ No newline at end of file